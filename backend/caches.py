@@ -0,0 +1,103 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """On-disk embedding cache keyed by (model, sha256(text)).
+
+    Re-ingesting a video or re-asking a question skips the embedding API
+    entirely on a hit; changing the model string namespaces the cache so
+    stale vectors are never served for a different model.
+    """
+
+    def __init__(self, path: str, model: str):
+        self.model = model
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS emb ("
+            "model TEXT, hash BLOB, vec BLOB, "
+            "PRIMARY KEY (model, hash))"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    def get_many(self, texts: List[str]) -> Dict[int, List[float]]:
+        """Return {index: vector} for every text already in the cache."""
+        hits = {}
+        with self._lock:
+            for i, text in enumerate(texts):
+                row = self._conn.execute(
+                    "SELECT vec FROM emb WHERE model = ? AND hash = ?",
+                    (self.model, self._key(text)),
+                ).fetchone()
+                if row is not None:
+                    hits[i] = np.frombuffer(row[0], dtype=np.float32).tolist()
+        return hits
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO emb (model, hash, vec) VALUES (?, ?, ?)",
+                [
+                    (
+                        self.model,
+                        self._key(text),
+                        np.asarray(vec, dtype=np.float32).tobytes(),
+                    )
+                    for text, vec in zip(texts, vectors)
+                ],
+            )
+            self._conn.commit()
+
+
+class LLMCache:
+    """On-disk LLM response cache keyed by sha256(model|temperature|prompt).
+
+    Repeating the same prompt at the same model and temperature is a
+    sub-millisecond lookup instead of an API round-trip. Entries expire
+    after ttl seconds so upstream model drift can't serve stale answers
+    indefinitely.
+    """
+
+    def __init__(self, path: str, ttl: float = 86400.0):
+        self.ttl = ttl
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm ("
+            "key BLOB PRIMARY KEY, response TEXT, ts REAL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(model: str, temperature: float, prompt: str) -> bytes:
+        return hashlib.sha256(
+            f"{model}|{temperature}|{prompt}".encode("utf-8")
+        ).digest()
+
+    def get(self, model: str, temperature: float, prompt: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, ts FROM llm WHERE key = ?",
+                (self._key(model, temperature, prompt),),
+            ).fetchone()
+        if row is not None and row[1] > time.time() - self.ttl:
+            return row[0]
+        return None
+
+    def put(self, model: str, temperature: float, prompt: str, response: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm (key, response, ts) VALUES (?, ?, ?)",
+                (self._key(model, temperature, prompt), response, time.time()),
+            )
+            self._conn.commit()
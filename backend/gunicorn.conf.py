@@ -0,0 +1,11 @@
+"""Gunicorn settings for the TubeRAG backend.
+
+Chat requests block for seconds on the Perplexity API, so threaded
+(gthread) workers are used to let I/O-bound requests overlap instead of
+serializing behind one another.
+"""
+
+workers = 2
+threads = 16
+worker_class = "gthread"
+timeout = 120
@@ -0,0 +1,29 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def build_session(pool_size: int = 16, retries: int = 3) -> requests.Session:
+    """Build a session with connection pooling and backoff retries.
+
+    Reusing one session amortizes TCP/TLS handshakes to zero after the
+    first call, and the adapter's Retry handles 429/503 with exponential
+    backoff (honouring Retry-After) so callers don't need manual sleep
+    loops. raise_on_status is off: after retries are exhausted the last
+    response is returned and callers keep their own status handling.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=[429, 503],
+            allowed_methods=None,
+            raise_on_status=False,
+        ),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -1,6 +1,8 @@
 import os
 import logging
+import orjson
 from flask import Flask, request, jsonify
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 from dotenv import load_dotenv
 from rag_engine import ChromaDBVideoRAG
@@ -13,8 +15,19 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class OrJSONProvider(JSONProvider):
+    """Flask JSON provider backed by orjson's C encoder/decoder."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 # Initialize Flask app
 app = Flask(__name__)
+app.json = OrJSONProvider(app)
 
 # Configure CORS for Chrome Extension and web access
 CORS(app, origins="*")
@@ -58,24 +71,23 @@ def list_videos():
 def debug_video(video_id):
     """Debug endpoint to inspect stored embeddings for a video."""
     try:
-        collection_name = f"video_{video_id.replace('-', '_')}"
-        
-        try:
-            collection = rag_engine.client.get_collection(name=collection_name)
-        except Exception:
+        collection = rag_engine.collection
+
+        # All videos share one collection, filtered by video_id metadata
+        count = len(collection.get(where={"video_id": video_id}, include=[])["ids"])
+
+        if count == 0:
             return jsonify({
                 "video_id": video_id,
                 "exists": False,
                 "error": "Video not found in database",
                 "success": False
             })
-        
-        # Get collection info
-        count = collection.count()
-        
+
         # Get sample data (first 3 chunks)
         if count > 0:
             sample = collection.get(
+                where={"video_id": video_id},
                 limit=3,
                 include=["documents", "embeddings", "metadatas"]
             )
@@ -83,26 +95,27 @@ def debug_video(video_id):
             # Format sample data
             sample_chunks = []
             for i in range(len(sample["ids"])):
-                # Handle embeddings - convert numpy arrays to lists
+                # Slice the embedding before converting so only the 5
+                # sampled values cross into Python, not all 384
                 embeddings = sample.get("embeddings")
                 if embeddings is not None and len(embeddings) > i:
                     emb = embeddings[i]
-                    # Convert to list if numpy array
-                    emb_list = emb.tolist() if hasattr(emb, 'tolist') else list(emb)
-                    emb_dims = len(emb_list)
-                    emb_sample = [float(x) for x in emb_list[:5]]
+                    emb_dims = emb.shape[0] if hasattr(emb, 'shape') else len(emb)
+                    head = emb[:5]
+                    emb_sample = head.tolist() if hasattr(head, 'tolist') else list(head)
                 else:
                     emb_dims = 0
                     emb_sample = []
-                
+
                 # Handle metadata
                 metadatas = sample.get("metadatas")
                 metadata = metadatas[i] if metadatas is not None and len(metadatas) > i else {}
-                
+
+                doc = sample["documents"][i]
                 chunk_info = {
                     "id": sample["ids"][i],
-                    "text_preview": sample["documents"][i][:200] + "..." if len(sample["documents"][i]) > 200 else sample["documents"][i],
-                    "text_length": len(sample["documents"][i]),
+                    "text_preview": doc[:200] + "..." if len(doc) > 200 else doc,
+                    "text_length": len(doc),
                     "embedding_dimensions": emb_dims,
                     "embedding_sample": emb_sample,
                     "metadata": metadata
@@ -113,7 +126,7 @@ def debug_video(video_id):
         
         return jsonify({
             "video_id": video_id,
-            "collection_name": collection_name,
+            "collection_name": collection.name,
             "exists": True,
             "total_chunks": count,
             "sample_chunks": sample_chunks,
@@ -201,7 +214,7 @@ def chat_with_video():
             )
 
         # Query the video
-        answer = rag_engine.query(question)
+        answer = rag_engine.query(video_id, question)
 
         return jsonify({"answer": answer, "video_id": video_id, "success": True})
 
@@ -220,6 +233,42 @@ def chat_with_video():
         )
 
 
+@app.route("/chat/stream", methods=["POST"])
+def chat_with_video_stream():
+    """Chat with a YouTube video, streaming the answer as server-sent events."""
+    data = request.get_json()
+
+    if not data:
+        return (
+            jsonify({"success": False, "error": "No JSON data provided"}),
+            400,
+        )
+
+    video_id = data.get("video_id", "")
+    question = data.get("question", "")
+
+    logger.info(f"Streaming chat request for video {video_id}: {question}")
+
+    if not video_id or len(video_id) != 11:
+        return (
+            jsonify({"success": False, "error": "Invalid YouTube video ID format"}),
+            400,
+        )
+
+    if not rag_engine.load_video(video_id):
+        return (
+            jsonify({"success": False, "error": "No transcript available"}),
+            404,
+        )
+
+    def generate():
+        for token in rag_engine.query_stream(video_id, question):
+            yield b"data: " + orjson.dumps({"delta": token}) + b"\n\n"
+        yield b"data: " + orjson.dumps({"done": True}) + b"\n\n"
+
+    return app.response_class(generate(), mimetype="text/event-stream")
+
+
 @app.route("/analyze", methods=["POST"])
 def analyze_video():
     """Analyze YouTube video sentiment from comments."""
@@ -333,4 +382,4 @@ if __name__ == "__main__":
     print("📍 Server will run on http://localhost:8000")
     print("🗄️  Using ChromaDB vector database for persistent storage")
     print("✨ Embeddings and chunks are stored efficiently!")
-    app.run(host="0.0.0.0", port=8000, debug=False)
+    app.run(host="0.0.0.0", port=8000, debug=False, threaded=True)
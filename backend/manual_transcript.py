@@ -1,11 +1,91 @@
-import requests
 import re
 import json
+import orjson
+from http_session import build_session
 from typing import Optional, List, Dict
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Locates the player-response assignment in the watch-page HTML: a cheap
+# literal find narrows the spot, then the compiled pattern absorbs any
+# spacing around the '=' (covers both the 'var ...' and bare forms)
+_PLAYER_RESPONSE_MARKER = b'ytInitialPlayerResponse'
+_YT_INITIAL_RE = re.compile(rb'ytInitialPlayerResponse\s*=\s*')
+
+# XML caption extraction: one pattern pulls the text nodes, one combined
+# substitution strips entities and leftover tags in a single pass
+_TEXT_RE = re.compile(r'<text[^>]*>(.*?)</text>', re.DOTALL)
+_CLEAN_RE = re.compile(r'&[a-zA-Z0-9#]+;|<[^>]+>')
+
+# Whitespace normalization for assembled transcript text
+_WS_RE = re.compile(r'\s+')
+
+# Shared pooled session: reuses the TCP connection between the watch-page
+# and transcript fetches, retries transient failures, and negotiates
+# compressed transfers (the watch page is ~1-3MB uncompressed but a few
+# hundred KB gzipped/brotli'd)
+_SESSION = build_session()
+_SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate, br',
+})
+
+
+def _extract_player_response(response) -> Optional[Dict]:
+    """
+    Pull ytInitialPlayerResponse out of a streaming watch-page response.
+
+    Scans the incoming bytes for the literal marker and decodes the JSON
+    object in place with raw_decode, so reading stops as soon as the blob
+    is complete instead of buffering and regex-searching the whole page.
+    """
+    decoder = json.JSONDecoder()
+    buf = bytearray()
+    search_pos = 0
+    start = -1
+
+    for data in response.iter_content(chunk_size=65536):
+        buf.extend(data)
+
+        while start == -1:
+            pos = buf.find(_PLAYER_RESPONSE_MARKER, search_pos)
+            if pos == -1:
+                # Resume the scan just before the next chunk's bytes, so
+                # earlier content is never rescanned
+                search_pos = max(
+                    search_pos, len(buf) - len(_PLAYER_RESPONSE_MARKER) + 1
+                )
+                break
+            match = _YT_INITIAL_RE.match(buf, pos)
+            if match is not None:
+                start = match.end()
+            elif len(buf) - pos > 64:
+                # Marker occurrence that isn't an assignment; skip past it
+                search_pos = pos + 1
+            else:
+                # The '=' may still be in flight; wait for more bytes
+                break
+
+        if start == -1:
+            continue
+
+        try:
+            # lstrip: when a chunk boundary lands between the '=' and the
+            # '{', the pattern's trailing \s* matches short and start
+            # points at leftover whitespace, which raw_decode won't skip
+            player_response, _ = decoder.raw_decode(
+                buf[start:].decode('utf-8', 'replace').lstrip()
+            )
+            return player_response
+        except json.JSONDecodeError:
+            # JSON object not fully downloaded yet
+            continue
+
+    return None
+
+
 def get_transcript_new_api(video_id: str) -> Optional[str]:
     """
     Fetch transcript using the new youtube-transcript-api (v1.2.3+).
@@ -36,35 +116,19 @@ def get_transcript_manual(video_id: str) -> Optional[str]:
     try:
         # Get the video page
         video_url = f"https://www.youtube.com/watch?v={video_id}"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept-Language': 'en-US,en;q=0.9'
-        }
-        
-        response = requests.get(video_url, headers=headers)
+
+        response = _SESSION.get(video_url, stream=True)
         response.raise_for_status()
-        
-        html_content = response.text
-        
-        # Find the ytInitialPlayerResponse
-        pattern = r'var ytInitialPlayerResponse = ({.*?});'
-        match = re.search(pattern, html_content)
-        
-        if not match:
-            # Try alternative pattern
-            pattern = r'ytInitialPlayerResponse\s*=\s*({.*?});'
-            match = re.search(pattern, html_content)
-        
-        if not match:
-            logger.error(f"Could not find ytInitialPlayerResponse for video {video_id}")
-            return None
-        
+
         try:
-            player_response = json.loads(match.group(1))
-        except json.JSONDecodeError:
-            logger.error(f"Could not parse ytInitialPlayerResponse for video {video_id}")
+            player_response = _extract_player_response(response)
+        finally:
+            response.close()
+
+        if player_response is None:
+            logger.error(f"Could not find ytInitialPlayerResponse for video {video_id}")
             return None
-        
+
         # Navigate to captions
         captions = player_response.get('captions', {})
         caption_tracks = captions.get('playerCaptionsTracklistRenderer', {}).get('captionTracks', [])
@@ -96,24 +160,25 @@ def get_transcript_manual(video_id: str) -> Optional[str]:
             transcript_url += '?fmt=json3'
         
         # Fetch the transcript
-        transcript_response = requests.get(transcript_url, headers=headers)
+        transcript_response = _SESSION.get(transcript_url)
         transcript_response.raise_for_status()
         
         # Try JSON format first
         try:
-            transcript_json = transcript_response.json()
+            transcript_json = orjson.loads(transcript_response.content)
             events = transcript_json.get('events', [])
-            
-            full_text = []
-            for event in events:
-                segs = event.get('segs', [])
-                for seg in segs:
-                    text = seg.get('utf8', '')
-                    if text and text.strip():
-                        full_text.append(text.strip())
-            
-            if full_text:
-                result = ' '.join(full_text)
+
+            # Join all segments in one pass, then normalize whitespace once
+            # instead of stripping each segment individually.
+            result = ' '.join(
+                seg['utf8']
+                for event in events
+                for seg in event.get('segs', ())
+                if seg.get('utf8', '').strip()
+            )
+            result = _WS_RE.sub(' ', result).strip()
+
+            if result:
                 logger.info(f"Successfully fetched manual transcript (JSON) for video {video_id} ({len(result)} characters)")
                 return result
         except:
@@ -121,20 +186,14 @@ def get_transcript_manual(video_id: str) -> Optional[str]:
         
         # Fallback to XML parsing
         transcript_xml = transcript_response.text
-        text_pattern = r'<text[^>]*>(.*?)</text>'
-        matches = re.findall(text_pattern, transcript_xml, re.DOTALL)
-        
+        matches = _TEXT_RE.findall(transcript_xml)
+
         if matches:
-            full_text = []
-            for match in matches:
-                clean_text = re.sub(r'&[a-zA-Z0-9#]+;', ' ', match)
-                clean_text = re.sub(r'<[^>]+>', '', clean_text)
-                clean_text = clean_text.strip()
-                if clean_text:
-                    full_text.append(clean_text)
-            
-            if full_text:
-                result = ' '.join(full_text)
+            # Join first, then clean entities/tags with one substitution
+            result = _CLEAN_RE.sub(' ', ' '.join(matches))
+            result = ' '.join(result.split())
+
+            if result:
                 logger.info(f"Successfully fetched manual transcript (XML) for video {video_id} ({len(result)} characters)")
                 return result
         
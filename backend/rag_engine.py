@@ -1,48 +1,380 @@
-import requests
+import asyncio
+import collections
+import os
+import threading
 import time
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Optional, Tuple
 from manual_transcript import get_transcript_fallback
+from caches import EmbeddingCache, LLMCache
+from http_session import build_session
 import chromadb
 from chromadb import Documents, EmbeddingFunction, Embeddings
+import numpy as np
+import orjson
+import re
 import logging
 
 logger = logging.getLogger(__name__)
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import onnxruntime
+    from huggingface_hub import hf_hub_download
+    from tokenizers import Tokenizer
+except ImportError:
+    onnxruntime = None
+
 # HuggingFace free Inference API
 HF_API_URL = "https://api-inference.huggingface.co/pipeline/feature-extraction/sentence-transformers/all-MiniLM-L6-v2"
 
+# Shared pooled session for the sync HF path; keep-alive spares a TLS
+# handshake per sub-batch
+_HF_SESSION = build_session()
+
+# Number of chunks embedded per batch during ingest (tunable per deployment)
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "128"))
+
+# Texts per HF feature-extraction request; keeps payloads under the
+# API's size cap while collapsing per-chunk round-trips
+HF_BATCH_SIZE = 32
+
+# Chunks written to Chroma per add() call during ingest
+ADD_BATCH_SIZE = 64
+
+# Threads for the fallback concurrent embedding path
+EMBED_MAX_WORKERS = 8
+
+# Model id namespacing the persistent embedding cache
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# Hub repo holding the ONNX export and tokenizer for local inference
+EMBEDDING_MODEL_REPO = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Sentence boundaries used to pick chunk break points; newline runs
+# count as boundaries for transcripts that keep caption line breaks
+_SENTENCE_BREAK_RE = re.compile(r"[.!?]\s+|\n+")
+
+# Word boundaries, the fallback cut when a window has no sentence break
+_SPACE_RE = re.compile(r" ")
 
-class HuggingFaceEmbedding(EmbeddingFunction):
-    """Embedding function using HuggingFace free Inference API."""
+# Max number of cached (video_id, question) -> answer entries
+ANSWER_CACHE_SIZE = 512
+
+# Max number of cached question embeddings; entries are ~1.5KB so even
+# the full cache stays under a few MB
+QUESTION_CACHE_SIZE = 2048
+
+# Max number of videos whose vectors stay resident in memory
+VIDEO_VECTOR_CACHE_SIZE = 32
+
+# Semantic answer cache: reuse an answer when a question's embedding is
+# this close to a previously answered one, update in place above the
+# duplicate threshold, and keep at most this many entries per video
+SEMANTIC_CACHE_THRESHOLD = 0.86
+SEMANTIC_CACHE_DUP_THRESHOLD = 0.95
+SEMANTIC_CACHE_PER_VIDEO = 64
+
+# Chunks whose embeddings are at least this similar to an already kept
+# chunk are dropped before indexing
+CHUNK_DEDUP_THRESHOLD = 0.86
+
+# Seconds the memoized video list stays fresh; extension polling bursts
+# within this window skip the full-collection metadata scan
+LIST_VIDEOS_TTL = 5.0
+
+# Chat prompt pieces, hoisted so they aren't rebuilt per request
+_PROMPT_HEADER = "Answer based on this video transcript:\n\n"
+_PROMPT_TAIL = """Question: {question}
+
+Respond in the same language as the question. Be concise and accurate."""
+
+
+def _compute_chunk_bounds(breaks, spaces, text_len, chunk_size, overlap):
+    """Compute (start, end) slice bounds for every chunk.
+
+    Each window cuts at the last sentence boundary past its midpoint,
+    falling back to the last word boundary so raw caption text without
+    punctuation still never splits mid-word. Pure integer/array math so
+    the whole loop can run under Numba when it's installed; the caller
+    does the actual string slicing.
+    """
+    bounds = np.empty(
+        (text_len // max(chunk_size // 2 - overlap, 1) + 2, 2), dtype=np.int64
+    )
+    n = 0
+    start = 0
+    while start < text_len:
+        end = min(start + chunk_size, text_len)
+        if end < text_len:
+            cut = -1
+            if breaks.size:
+                idx = np.searchsorted(breaks, start + chunk_size, side="right") - 1
+                if idx >= 0 and breaks[idx] > start + chunk_size // 2:
+                    cut = breaks[idx]
+            if cut == -1 and spaces.size:
+                idx = np.searchsorted(spaces, start + chunk_size, side="right") - 1
+                if idx >= 0 and spaces[idx] > start + chunk_size // 2:
+                    cut = spaces[idx]
+            if cut != -1:
+                end = cut
+        bounds[n, 0] = start
+        bounds[n, 1] = end
+        n += 1
+        if end >= text_len:
+            break
+        start = end - overlap
+    return bounds[:n]
+
+
+if njit is not None:
+    _compute_chunk_bounds = njit(cache=True)(_compute_chunk_bounds)
+
+
+def _quantize_rows(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric int8 quantization with one scale per row.
+
+    `int8 @ query * scale` reproduces the float32 cosine score to ~0.01,
+    at a quarter of the memory and bandwidth.
+    """
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.round(matrix / scales[:, None]).astype(np.int8)
+    return quantized, scales
+
+
+class CachedEmbedding(EmbeddingFunction):
+    """Base embedding function with a persistent content-hash cache.
+
+    The cache, when provided, is consulted first so previously embedded
+    text is never embedded again; subclasses implement _embed_texts for
+    the misses.
+    """
+
+    def __init__(self, cache: Optional[EmbeddingCache] = None):
+        self.cache = cache
+
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
 
     def __call__(self, input: Documents) -> Embeddings:
+        texts = [text[:512] for text in input]
+
+        hits = {}
+        if self.cache is not None:
+            try:
+                hits = self.cache.get_many(texts)
+            except Exception as e:
+                logger.error(f"Embedding cache read error: {e}")
+
+        miss_indices = [i for i in range(len(texts)) if i not in hits]
+        vectors = [None] * len(texts)
+        for i, vec in hits.items():
+            vectors[i] = vec
+
+        if miss_indices:
+            embedded = self._embed_texts([texts[i] for i in miss_indices])
+            for i, vec in zip(miss_indices, embedded):
+                vectors[i] = vec
+            if self.cache is not None:
+                # Never cache the all-zero failure sentinel
+                fresh = [
+                    (texts[i], vec)
+                    for i, vec in zip(miss_indices, embedded)
+                    if any(vec)
+                ]
+                if fresh:
+                    try:
+                        self.cache.put_many(*zip(*fresh))
+                    except Exception as e:
+                        logger.error(f"Embedding cache write error: {e}")
+
+        return vectors
+
+
+class HuggingFaceEmbedding(CachedEmbedding):
+    """Embedding function using HuggingFace free Inference API.
+
+    Texts are sent in sub-batches of HF_BATCH_SIZE per request, so a
+    50-chunk transcript costs two round-trips instead of fifty.
+    """
+
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        batches = [
+            texts[i:i + HF_BATCH_SIZE]
+            for i in range(0, len(texts), HF_BATCH_SIZE)
+        ]
+
+        # With several batches in flight the wall clock is one batch
+        # latency instead of their sum; the workload is pure I/O wait.
+        if aiohttp is not None and len(batches) > 1:
+            try:
+                results = asyncio.run(self._embed_batches_async(batches))
+                return [vec for batch in results for vec in batch]
+            except Exception as e:
+                logger.error(f"Concurrent embedding failed, falling back: {e}")
+
+        if len(batches) > 1:
+            # Without aiohttp, threads still overlap the per-batch waits:
+            # requests releases the GIL during I/O, and map preserves order
+            with ThreadPoolExecutor(max_workers=EMBED_MAX_WORKERS) as executor:
+                results = list(executor.map(self._embed_batch, batches))
+            return [vec for batch in results for vec in batch]
+
         embeddings = []
-        for text in input:
-            for attempt in range(3):
-                try:
-                    response = requests.post(
-                        HF_API_URL,
-                        json={"inputs": text[:512], "options": {"wait_for_model": True}},
-                        timeout=30
-                    )
-                    if response.status_code == 200:
-                        embedding = response.json()
-                        if isinstance(embedding[0], list):
-                            embedding = embedding[0]
-                        embeddings.append(embedding)
-                        break
-                    elif response.status_code == 503:
-                        time.sleep(2)
+        for batch in batches:
+            embeddings.extend(self._embed_batch(batch))
+        return embeddings
+
+    async def _embed_batches_async(self, batches):
+        connector = aiohttp.TCPConnector(limit=8)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            return await asyncio.gather(
+                *[self._embed_batch_async(session, batch) for batch in batches]
+            )
+
+    async def _embed_batch_async(self, session, texts: List[str]) -> List[List[float]]:
+        for attempt in range(3):
+            try:
+                async with session.post(
+                    HF_API_URL,
+                    data=orjson.dumps(
+                        {"inputs": texts, "options": {"wait_for_model": True}}
+                    ),
+                    headers={"Content-Type": "application/json"},
+                    timeout=aiohttp.ClientTimeout(total=60)
+                ) as response:
+                    if response.status == 200:
+                        return self._parse_batch(orjson.loads(await response.read()))
+                    elif response.status == 503:
+                        retry_after = response.headers.get("Retry-After")
+                        delay = float(retry_after) if retry_after else 2 ** attempt
+                        await asyncio.sleep(delay)
                     else:
-                        logger.error(f"HF API error: {response.status_code}")
-                        embeddings.append([0.0] * 384)
+                        logger.error(f"HF API error: {response.status}")
                         break
-                except Exception as e:
-                    logger.error(f"Embedding error: {e}")
-                    if attempt == 2:
-                        embeddings.append([0.0] * 384)
+            except Exception as e:
+                logger.error(f"Embedding error: {e}")
+        return [[0.0] * 384 for _ in texts]
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed one sub-batch with a single POST, retrying on 503."""
+        for attempt in range(3):
+            try:
+                response = _HF_SESSION.post(
+                    HF_API_URL,
+                    data=orjson.dumps(
+                        {"inputs": texts, "options": {"wait_for_model": True}}
+                    ),
+                    headers={"Content-Type": "application/json"},
+                    timeout=60
+                )
+                if response.status_code == 200:
+                    return self._parse_batch(orjson.loads(response.content))
+                elif response.status_code == 503:
+                    # Sleep only as long as the server asks; the fixed
+                    # exponential wait is just the fallback
+                    retry_after = response.headers.get("Retry-After")
+                    time.sleep(float(retry_after) if retry_after else 2 ** attempt)
+                else:
+                    logger.error(f"HF API error: {response.status_code}")
+                    break
+            except Exception as e:
+                logger.error(f"Embedding error: {e}")
+        return [[0.0] * 384 for _ in texts]
+
+    @staticmethod
+    def _parse_batch(data) -> List[List[float]]:
+        arr = np.asarray(data, dtype=np.float32)
+        if arr.ndim == 3:
+            # Token-level output; mean-pool over the sequence axis
+            arr = arr.mean(axis=1)
+        elif arr.ndim == 1:
+            arr = arr.reshape(1, -1)
+        return arr.tolist()
+
+
+class LocalONNXEmbedding(CachedEmbedding):
+    """In-process all-MiniLM-L6-v2 inference via ONNX Runtime.
+
+    Removes the network round-trip, rate limits, and 503 retries of the
+    HF API; a CPU batch embeds in milliseconds instead of hundreds. The
+    ONNX export and tokenizer are fetched from the Hub once and loaded
+    lazily on first use.
+    """
+
+    def __init__(self, cache: Optional[EmbeddingCache] = None):
+        super().__init__(cache)
+        self._session = None
+        self._tokenizer = None
+        self._init_lock = threading.Lock()
+
+    @staticmethod
+    def available() -> bool:
+        return onnxruntime is not None
+
+    def _ensure_loaded(self):
+        if self._session is not None:
+            return
+        with self._init_lock:
+            if self._session is not None:
+                return
+            model_path = hf_hub_download(EMBEDDING_MODEL_REPO, "onnx/model.onnx")
+            tokenizer_path = hf_hub_download(EMBEDDING_MODEL_REPO, "tokenizer.json")
+            tokenizer = Tokenizer.from_file(tokenizer_path)
+            tokenizer.enable_padding()
+            tokenizer.enable_truncation(max_length=256)
+            self._tokenizer = tokenizer
+            self._session = onnxruntime.InferenceSession(
+                model_path, providers=["CPUExecutionProvider"]
+            )
+
+    def _embed_texts(self, texts: List[str]) -> List[List[float]]:
+        self._ensure_loaded()
+        embeddings = []
+        for i in range(0, len(texts), HF_BATCH_SIZE):
+            embeddings.extend(self._run_batch(texts[i:i + HF_BATCH_SIZE]))
         return embeddings
 
+    def _run_batch(self, texts: List[str]) -> List[List[float]]:
+        encodings = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if any(inp.name == "token_type_ids" for inp in self._session.get_inputs()):
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        hidden = self._session.run(None, feeds)[0]
+
+        # Mean-pool over real tokens, then L2-normalize
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (pooled / norms).tolist()
+
+
+@lru_cache(maxsize=1)
+def _get_client(path: str):
+    """Process-wide Chroma client for a persist directory.
+
+    PersistentClient opens the SQLite store and mmaps the HNSW files;
+    constructing a second ChromaDBVideoRAG must reuse the warm client
+    rather than reload all of that from disk.
+    """
+    return chromadb.PersistentClient(path=path)
+
 
 class ChromaDBVideoRAG:
     """RAG engine using ChromaDB with HuggingFace embeddings."""
@@ -50,32 +382,136 @@ class ChromaDBVideoRAG:
     def __init__(self, perplexity_api_key: str, persist_dir: str = "./chroma_db"):
         self.perplexity_api_key = perplexity_api_key
         self.perplexity_url = "https://api.perplexity.ai/chat/completions"
-        self.embedding_fn = HuggingFaceEmbedding()
-        self.client = chromadb.PersistentClient(path=persist_dir)
-        self.current_video_id = None
-        self.current_collection = None
+        os.makedirs(persist_dir, exist_ok=True)
+        try:
+            embedding_cache = EmbeddingCache(
+                os.path.join(persist_dir, "embedding_cache.db"), EMBEDDING_MODEL
+            )
+        except Exception as e:
+            logger.warning(f"Embedding cache unavailable: {e}")
+            embedding_cache = None
+        try:
+            self._llm_cache = LLMCache(os.path.join(persist_dir, "llm_cache.db"))
+        except Exception as e:
+            logger.warning(f"LLM cache unavailable: {e}")
+            self._llm_cache = None
+        if LocalONNXEmbedding.available():
+            logger.info("Using local ONNX embedding inference")
+            self.embedding_fn = LocalONNXEmbedding(embedding_cache)
+        else:
+            logger.info("onnxruntime not installed; using HF inference API")
+            self.embedding_fn = HuggingFaceEmbedding(embedding_cache)
+        # Reuse one pooled session for Perplexity calls so TLS setup is
+        # paid once; the adapter retries transient 429/503 responses
+        self.session = build_session()
+        self.client = _get_client(os.path.abspath(persist_dir))
+        # One shared collection for all videos, filtered by video_id
+        # metadata; avoids building a fresh HNSW index and SQLite tables
+        # per video.
+        self.collection = self.client.get_or_create_collection(
+            name="videos",
+            embedding_function=self.embedding_fn,
+            metadata={"hnsw:space": "cosine"}
+        )
+        # Per-video (normalized embedding matrix, chunk texts) for exact
+        # inner-product search; collections are small enough that a single
+        # matmul beats an HNSW traversal. Bounded LRU so a long-running
+        # server with many videos keeps only the hot set resident.
+        self._video_vectors = collections.OrderedDict()
+        # Guards the in-memory caches under threaded workers
+        self._lock = threading.Lock()
+        # LRU of recent answers; repeated questions skip retrieval and the
+        # Perplexity round-trip entirely
+        self._answer_cache = collections.OrderedDict()
+        # LRU of question embeddings; retries and re-asks skip the
+        # embedding round-trip
+        self._question_embeddings = collections.OrderedDict()
+        # Per-video semantic cache: paraphrased questions whose embeddings
+        # are close enough reuse the stored answer without retrieval or an
+        # LLM call
+        self._semantic_cache = {}
+        # Memoized list_videos result; invalidated on load/delete
+        self._video_list = None
+        self._video_list_ts = 0.0
+        self._warm_up()
+
+    def _warm_up(self):
+        """Trigger the HF model load at startup instead of on the first chat."""
+        try:
+            self.embedding_fn(["warmup"])
+        except Exception as e:
+            logger.warning(f"Embedder warm-up failed: {e}")
 
     def _generate_content(self, prompt: str) -> str:
+        # Persistent tier below the in-memory answer caches: survives
+        # restarts and dedupes identical prompts across workers
+        if self._llm_cache is not None:
+            cached = self._llm_cache.get("sonar", 0.3, prompt)
+            if cached is not None:
+                return cached
         try:
-            response = requests.post(
+            response = self.session.post(
                 self.perplexity_url,
                 headers={
                     "Authorization": f"Bearer {self.perplexity_api_key}",
                     "Content-Type": "application/json"
                 },
-                json={
+                # Pre-serialized with orjson; json= would re-encode with
+                # the slower stdlib encoder
+                data=orjson.dumps({
                     "model": "sonar",
                     "messages": [{"role": "user", "content": prompt}],
                     "temperature": 0.3,
                     "max_tokens": 1024
-                }
+                })
             )
             response.raise_for_status()
-            return response.json()["choices"][0]["message"]["content"]
+            answer = orjson.loads(response.content)["choices"][0]["message"]["content"]
+            if self._llm_cache is not None:
+                try:
+                    self._llm_cache.put("sonar", 0.3, prompt, answer)
+                except Exception as e:
+                    logger.error(f"LLM cache write error: {e}")
+            return answer
         except Exception as e:
             logger.error(f"LLM error: {e}")
             return f"Sorry, I encountered an error: {str(e)}"
 
+    def _generate_content_stream(self, prompt: str):
+        """Yield answer tokens from Perplexity's SSE stream as they arrive."""
+        response = self.session.post(
+            self.perplexity_url,
+            headers={
+                "Authorization": f"Bearer {self.perplexity_api_key}",
+                "Content-Type": "application/json"
+            },
+            data=orjson.dumps({
+                "model": "sonar",
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": 0.3,
+                "max_tokens": 1024,
+                "stream": True
+            }),
+            stream=True
+        )
+        response.raise_for_status()
+        try:
+            for line in response.iter_lines():
+                if not line or not line.startswith(b"data: "):
+                    continue
+                payload = line[6:]
+                if payload == b"[DONE]":
+                    break
+                try:
+                    delta = orjson.loads(payload)["choices"][0]["delta"]
+                except (orjson.JSONDecodeError, LookupError):
+                    continue
+                content = delta.get("content")
+                if content:
+                    yield content
+        finally:
+            response.close()
+
     def _fetch_transcript(self, video_id: str) -> Optional[str]:
         try:
             transcript = get_transcript_fallback(video_id)
@@ -88,37 +524,109 @@ class ChromaDBVideoRAG:
             return None
 
     def _split_text(self, text: str, chunk_size: int = 800, overlap: int = 100) -> List[str]:
+        # One regex pass collects every sentence boundary; each chunk end is
+        # then a binary search instead of rescanning the chunk with rfind.
+        breaks = np.fromiter(
+            (m.end() for m in _SENTENCE_BREAK_RE.finditer(text)), dtype=np.int64
+        )
+        spaces = np.fromiter(
+            (m.start() for m in _SPACE_RE.finditer(text)), dtype=np.int64
+        )
+        bounds = _compute_chunk_bounds(breaks, spaces, len(text), chunk_size, overlap)
         chunks = []
-        start = 0
-        while start < len(text):
-            end = min(start + chunk_size, len(text))
-            chunk = text[start:end]
-            if end < len(text):
-                break_point = max(chunk.rfind("."), chunk.rfind(" "))
-                if break_point > chunk_size // 2:
-                    chunk = text[start:start + break_point + 1]
-                    end = start + break_point + 1
-            chunks.append(chunk.strip())
-            start = end - overlap
-        return [c for c in chunks if c.strip()]
-
-    def _get_collection_name(self, video_id: str) -> str:
-        return f"video_{video_id.replace('-', '_')}"
+        for start, end in bounds:
+            chunk = text[start:end].strip()
+            if chunk:
+                chunks.append(chunk)
+        return chunks
+
+    def _cache_vectors(self, video_id: str, embeddings, chunks: List[str]):
+        """Keep a normalized, int8-quantized embedding matrix in memory.
+
+        Vectors are stored as int8 with a per-vector scale (symmetric
+        quantization), cutting the matrix to a quarter of its float32 size;
+        scores are rescaled on the fly at query time.
+        """
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        quantized, scales = _quantize_rows(matrix)
+        with self._lock:
+            self._video_vectors[video_id] = (quantized, scales, list(chunks))
+            self._video_vectors.move_to_end(video_id)
+            while len(self._video_vectors) > VIDEO_VECTOR_CACHE_SIZE:
+                self._video_vectors.popitem(last=False)
+
+    def _get_vectors(self, video_id: str) -> Optional[Tuple[np.ndarray, np.ndarray, List[str]]]:
+        """Return cached vectors, rebuilding from the collection if needed."""
+        with self._lock:
+            cached = self._video_vectors.get(video_id)
+            if cached is not None:
+                self._video_vectors.move_to_end(video_id)
+                return cached
+
+        try:
+            data = self.collection.get(
+                where={"video_id": video_id},
+                include=["embeddings", "documents"]
+            )
+            embeddings = data.get("embeddings")
+            documents = data.get("documents")
+            if embeddings is None or len(embeddings) == 0:
+                return None
+            self._cache_vectors(video_id, embeddings, documents)
+            return self._video_vectors[video_id]
+        except Exception as e:
+            logger.error(f"Vector cache rebuild error: {e}")
+            return None
+
+    def _embed_chunks(self, chunks: List[str]) -> np.ndarray:
+        """Embed chunks in mini-batches so ingest isn't one-chunk-at-a-time.
+
+        Returns one contiguous float32 array; Chroma accepts it directly,
+        avoiding per-float boxing of N x 384 Python floats.
+        """
+        embeddings = []
+        for i in range(0, len(chunks), EMBED_BATCH_SIZE):
+            embeddings.extend(self.embedding_fn(chunks[i:i + EMBED_BATCH_SIZE]))
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def _dedup_chunks(
+        self, chunks: List[str], embeddings: np.ndarray
+    ) -> Tuple[List[str], np.ndarray]:
+        """Drop near-duplicate chunks before indexing.
+
+        Overlapping splits and repetitive transcript passages (intros,
+        outros, refrains) produce chunks whose embeddings carry the same
+        meaning; a greedy pass keeps the first representative of each
+        cluster. Often removes a third or more of a transcript's chunks.
+        """
+        if len(chunks) < 2:
+            return chunks, embeddings
+
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix = embeddings / norms
+
+        kept = [0]
+        for i in range(1, len(chunks)):
+            if (matrix[kept] @ matrix[i]).max() < CHUNK_DEDUP_THRESHOLD:
+                kept.append(i)
+
+        if len(kept) < len(chunks):
+            logger.info(f"Deduplicated {len(chunks) - len(kept)} of {len(chunks)} chunks")
+            return [chunks[i] for i in kept], embeddings[kept]
+        return chunks, embeddings
 
     def load_video(self, video_id: str) -> bool:
         try:
-            if self.current_video_id == video_id and self.current_collection:
+            if video_id in self._video_vectors:
                 return True
 
-            collection_name = self._get_collection_name(video_id)
-
             try:
-                self.current_collection = self.client.get_collection(
-                    name=collection_name,
-                    embedding_function=self.embedding_fn
-                )
-                if self.current_collection.count() > 0:
-                    self.current_video_id = video_id
+                existing = self.collection.get(where={"video_id": video_id}, limit=1)
+                if existing["ids"]:
                     return True
             except:
                 pass
@@ -131,21 +639,33 @@ class ChromaDBVideoRAG:
             if not chunks:
                 return False
 
-            logger.info(f"Processing {len(chunks)} chunks...")
+            # The transcript itself is no longer needed once split
+            del transcript
 
-            self.current_collection = self.client.get_or_create_collection(
-                name=collection_name,
-                embedding_function=self.embedding_fn,
-                metadata={"hnsw:space": "cosine"}
-            )
+            logger.info(f"Processing {len(chunks)} chunks...")
 
-            self.current_collection.add(
-                ids=[f"chunk_{i}" for i in range(len(chunks))],
-                documents=chunks,
-                metadatas=[{"chunk_index": i} for i in range(len(chunks))]
-            )
+            # Embed up front in batches and hand Chroma the vectors directly,
+            # so it never falls back to embedding documents one at a time.
+            embeddings = self._embed_chunks(chunks)
+            chunks, embeddings = self._dedup_chunks(chunks, embeddings)
+
+            # Write in batches: bounded peak memory, and the collection is
+            # queryable before the whole ingest finishes
+            for i in range(0, len(chunks), ADD_BATCH_SIZE):
+                j = min(i + ADD_BATCH_SIZE, len(chunks))
+                self.collection.add(
+                    ids=[f"{video_id}_{n}" for n in range(i, j)],
+                    documents=chunks[i:j],
+                    metadatas=[
+                        {"video_id": video_id, "chunk_index": n}
+                        for n in range(i, j)
+                    ],
+                    embeddings=embeddings[i:j]
+                )
 
-            self.current_video_id = video_id
+            self._cache_vectors(video_id, embeddings, chunks)
+            with self._lock:
+                self._video_list = None
             logger.info(f"Loaded video {video_id}")
             return True
 
@@ -153,30 +673,151 @@ class ChromaDBVideoRAG:
             logger.error(f"Load error: {e}")
             return False
 
-    def query(self, question: str, k: int = 3) -> str:
-        if not self.current_collection:
-            return "No video loaded."
+    def _embed_question(self, question: str) -> np.ndarray:
+        """Embed a question, reusing the embedding on repeated asks."""
+        key = question.strip().lower()
+        with self._lock:
+            cached = self._question_embeddings.get(key)
+            if cached is not None:
+                self._question_embeddings.move_to_end(key)
+                return cached
+
+        q = np.asarray(self.embedding_fn([question])[0], dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if norm > 0:
+            q = q / norm
+        with self._lock:
+            self._question_embeddings[key] = q
+            if len(self._question_embeddings) > QUESTION_CACHE_SIZE:
+                self._question_embeddings.popitem(last=False)
+        return q
+
+    def _search_chunks(self, video_id: str, question: str, k: int) -> List[str]:
+        """Retrieve the top-k chunks for a question.
+
+        Uses exact cosine search over the in-memory matrix when available
+        (a single matmul for these small collections), falling back to the
+        Chroma HNSW query otherwise.
+        """
+        q = self._embed_question(question)
+
+        vectors = self._get_vectors(video_id)
+        if vectors is not None:
+            quantized, scales, chunk_texts = vectors
+            # Dequantize via the per-vector scale after the integer dot
+            scores = (quantized @ q) * scales
+            top = np.argsort(scores)[::-1][:k]
+            return [chunk_texts[i] for i in top]
+
+        results = self.collection.query(
+            query_embeddings=[q.tolist()],
+            n_results=k,
+            where={"video_id": video_id}
+        )
+        return results["documents"][0] if results["documents"] else []
+
+    def _semantic_lookup(self, video_id: str, q: np.ndarray) -> Optional[str]:
+        """Return a cached answer for a semantically close question, if any."""
+        with self._lock:
+            entry = self._semantic_cache.get(video_id)
+            if entry is None:
+                return None
+            matrix, scales, answers = entry
+            sims = (matrix @ q) * scales
+            best = int(np.argmax(sims))
+            if sims[best] >= SEMANTIC_CACHE_THRESHOLD:
+                return answers[best]
+            return None
+
+    def _semantic_store(self, video_id: str, q: np.ndarray, answer: str):
+        # Question rows are stored int8-quantized like the chunk matrices
+        new_row, new_scale = _quantize_rows(q[None, :])
+        with self._lock:
+            entry = self._semantic_cache.get(video_id)
+            if entry is not None:
+                matrix, scales, answers = entry
+                sims = (matrix @ q) * scales
+                best = int(np.argmax(sims))
+                if sims[best] >= SEMANTIC_CACHE_DUP_THRESHOLD:
+                    # Near-duplicate question; refresh its answer in place
+                    answers[best] = answer
+                    return
+                matrix = np.vstack([matrix, new_row])
+                scales = np.concatenate([scales, new_scale])
+                answers = answers + [answer]
+                if len(answers) > SEMANTIC_CACHE_PER_VIDEO:
+                    matrix = matrix[1:]
+                    scales = scales[1:]
+                    answers = answers[1:]
+            else:
+                matrix = new_row
+                scales = new_scale
+                answers = [answer]
+            self._semantic_cache[video_id] = (matrix, scales, answers)
+
+    def _build_prompt(self, question: str, chunks: List[str]) -> str:
+        # Assemble the prompt in one pass: header, chunks with separators,
+        # then the question tail, joined once.
+        parts = [_PROMPT_HEADER]
+        for chunk in chunks:
+            parts.append(chunk)
+            parts.append("\n\n")
+        parts.append(_PROMPT_TAIL.format(question=question))
+        return "".join(parts)
+
+    def query_stream(self, video_id: str, question: str, k: int = 3):
+        """Like query(), but yields answer tokens as they stream in."""
+        if not video_id:
+            yield "No video loaded."
+            return
 
         try:
-            results = self.current_collection.query(
-                query_texts=[question],
-                n_results=k
+            chunks = self._search_chunks(video_id, question, k)
+            if not chunks:
+                yield "No relevant information found."
+                return
+
+            yield from self._generate_content_stream(
+                self._build_prompt(question, chunks)
             )
+        except Exception as e:
+            logger.error(f"Stream query error: {e}")
+            yield f"Error: {str(e)}"
 
-            chunks = results["documents"][0] if results["documents"] else []
-            if not chunks:
-                return "No relevant information found."
+    def query(self, video_id: str, question: str, k: int = 3) -> str:
+        if not video_id:
+            return "No video loaded."
 
-            context = "\n\n".join(chunks)
-            prompt = f"""Answer based on this video transcript:
+        cache_key = (video_id, question.strip().lower())
+        with self._lock:
+            cached = self._answer_cache.get(cache_key)
+            if cached is not None:
+                self._answer_cache.move_to_end(cache_key)
+                return cached
 
-{context}
+        try:
+            # Semantic tier: a paraphrase of an already answered question
+            # skips retrieval and the LLM call
+            q = self._embed_question(question)
+            semantic_hit = self._semantic_lookup(video_id, q)
+            if semantic_hit is not None:
+                return semantic_hit
+
+            chunks = self._search_chunks(video_id, question, k)
+            if not chunks:
+                return "No relevant information found."
 
-Question: {question}
+            answer = self._generate_content(self._build_prompt(question, chunks))
 
-Respond in the same language as the question. Be concise and accurate."""
+            # Don't cache failed generations
+            if not answer.startswith("Sorry, I encountered an error"):
+                self._semantic_store(video_id, q, answer)
+                with self._lock:
+                    self._answer_cache[cache_key] = answer
+                    if len(self._answer_cache) > ANSWER_CACHE_SIZE:
+                        self._answer_cache.popitem(last=False)
 
-            return self._generate_content(prompt)
+            return answer
 
         except Exception as e:
             logger.error(f"Query error: {e}")
@@ -184,16 +825,34 @@ Respond in the same language as the question. Be concise and accurate."""
 
     def delete_video(self, video_id: str) -> bool:
         try:
-            self.client.delete_collection(name=self._get_collection_name(video_id))
-            if self.current_video_id == video_id:
-                self.current_video_id = None
-                self.current_collection = None
+            self.collection.delete(where={"video_id": video_id})
+            with self._lock:
+                self._video_vectors.pop(video_id, None)
+                self._semantic_cache.pop(video_id, None)
+                self._video_list = None
+                for key in [k for k in self._answer_cache if k[0] == video_id]:
+                    del self._answer_cache[key]
             return True
         except:
             return False
 
     def list_videos(self) -> List[str]:
+        now = time.monotonic()
+        with self._lock:
+            if (
+                self._video_list is not None
+                and now - self._video_list_ts < LIST_VIDEOS_TTL
+            ):
+                return self._video_list
         try:
-            return [c.name[6:].replace("_", "-") for c in self.client.list_collections() if c.name.startswith("video_")]
+            data = self.collection.get(include=["metadatas"])
+            metadatas = data.get("metadatas") or []
+            videos = list(dict.fromkeys(
+                m["video_id"] for m in metadatas if m and "video_id" in m
+            ))
         except:
             return []
+        with self._lock:
+            self._video_list = videos
+            self._video_list_ts = now
+        return videos
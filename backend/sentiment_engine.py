@@ -1,11 +1,28 @@
-import json
-import requests
-from typing import Dict, List
+import orjson
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from caches import LLMCache
+from http_session import build_session
 from youtube_comment_downloader import YoutubeCommentDownloader, SORT_BY_POPULAR
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Shared pooled session for Perplexity calls; concurrent batch requests
+# reuse warm connections instead of opening one each
+_SESSION = build_session()
+
+# Comments analyzed per LLM call; batches run concurrently
+COMMENT_BATCH_SIZE = 20
+
+# Cap on simultaneous Perplexity calls
+MAX_CONCURRENT_LLM_CALLS = 5
+
+# Strips a ```json ... ``` fence around an LLM response in one match
+_FENCE_RE = re.compile(r"^```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+
 
 class SentimentEngine:
     """
@@ -17,9 +34,24 @@ class SentimentEngine:
         self.perplexity_api_key = perplexity_api_key
         self.perplexity_url = "https://api.perplexity.ai/chat/completions"
         self.downloader = YoutubeCommentDownloader()
+        # Shared with the RAG engine's cache file; re-analyzing a video
+        # whose comment set hasn't changed skips the LLM calls entirely
+        try:
+            self._llm_cache = LLMCache(
+                os.path.join(
+                    os.getenv("CHROMA_PERSIST_DIR", "./chroma_db"), "llm_cache.db"
+                )
+            )
+        except Exception as e:
+            logger.warning(f"LLM cache unavailable: {e}")
+            self._llm_cache = None
 
     def _generate_content(self, prompt: str) -> str:
         """Generate content using Perplexity API."""
+        if self._llm_cache is not None:
+            cached = self._llm_cache.get("sonar", 0.2, prompt)
+            if cached is not None:
+                return cached
         try:
             headers = {
                 "Authorization": f"Bearer {self.perplexity_api_key}",
@@ -33,31 +65,46 @@ class SentimentEngine:
                 "max_tokens": 2048,
             }
 
-            response = requests.post(self.perplexity_url, headers=headers, json=payload)
+            # Pre-serialized with orjson; json= would re-encode with the
+            # slower stdlib encoder
+            response = _SESSION.post(
+                self.perplexity_url, headers=headers, data=orjson.dumps(payload)
+            )
             response.raise_for_status()
-            data = response.json()
-            return data["choices"][0]["message"]["content"]
+            data = orjson.loads(response.content)
+            content = data["choices"][0]["message"]["content"]
+            if self._llm_cache is not None:
+                try:
+                    self._llm_cache.put("sonar", 0.2, prompt, content)
+                except Exception as e:
+                    logger.error(f"LLM cache write error: {e}")
+            return content
         except Exception as e:
             logger.error(f"Error generating content: {e}")
             return f"Error: {str(e)}"
 
-    def _fetch_comments(self, video_id: str, max_results: int = 10) -> List[str]:
+    def _fetch_comments(self, video_id: str, max_results: int = 60) -> List[str]:
         """Fetch top comments from YouTube video using youtube-comment-downloader."""
         try:
             comments = []
-            count = 0
+            seen = set()
 
-            # Get comments sorted by popularity
+            # Get comments sorted by popularity, skipping copy-paste
+            # duplicates so they don't waste LLM tokens downstream
             for comment in self.downloader.get_comments_from_url(
                 f"https://www.youtube.com/watch?v={video_id}",
                 sort_by=SORT_BY_POPULAR,
             ):
-                if count >= max_results:
+                if len(comments) >= max_results:
                     break
                 text = comment.get("text", "")
-                if text:
-                    comments.append(text)
-                    count += 1
+                if not text:
+                    continue
+                key = hash(text.strip().lower())
+                if key in seen:
+                    continue
+                seen.add(key)
+                comments.append(text)
 
             logger.info(f"Fetched {len(comments)} comments for video {video_id}")
             return comments
@@ -66,12 +113,10 @@ class SentimentEngine:
             logger.error(f"Error fetching comments for video {video_id}: {str(e)}")
             return []
 
-    def _analyze_with_llm(self, comments: List[str]) -> Dict:
-        """Analyze comments using Perplexity API."""
-        try:
-            comments_text = "\n".join([f"- {comment}" for comment in comments[:3]])
+    def _build_prompt(self, comments: List[str]) -> str:
+        comments_text = "\n".join([f"- {comment}" for comment in comments])
 
-            prompt = f"""Analyze the following YouTube video comments and provide a comprehensive sentiment analysis.
+        return f"""Analyze the following YouTube video comments and provide a comprehensive sentiment analysis.
 
 Comments:
 {comments_text}
@@ -94,23 +139,72 @@ Guidelines:
 
 Respond with ONLY the JSON object, no additional text."""
 
-            response = self._generate_content(prompt)
-
-            # Parse JSON response
-            try:
-                clean_response = response.strip()
-                if clean_response.startswith("```json"):
-                    clean_response = clean_response[7:]
-                if clean_response.startswith("```"):
-                    clean_response = clean_response[3:]
-                if clean_response.endswith("```"):
-                    clean_response = clean_response[:-3]
-                clean_response = clean_response.strip()
-
-                analysis = json.loads(clean_response)
-                return analysis
-            except json.JSONDecodeError:
-                logger.warning("Failed to parse LLM response as JSON")
+    def _parse_analysis(self, response: str) -> Optional[Dict]:
+        """Parse one LLM response into an analysis dict, or None."""
+        clean_response = response.strip()
+        fenced = _FENCE_RE.match(clean_response)
+        if fenced:
+            clean_response = fenced.group(1)
+
+        try:
+            return orjson.loads(clean_response)
+        except orjson.JSONDecodeError:
+            logger.warning("Failed to parse LLM response as JSON")
+            return None
+
+    @staticmethod
+    def _merge_analyses(parsed: List[Tuple[int, Dict]]) -> Dict:
+        """Merge per-batch analyses weighted by batch size."""
+        total = sum(weight for weight, _ in parsed)
+        score = round(
+            sum(weight * a.get("worth_watching_score", 50) for weight, a in parsed)
+            / total
+        )
+
+        sentiments = [a.get("overall_sentiment", "mixed") for _, a in parsed]
+        confidences = [a.get("confidence_level", "low") for _, a in parsed]
+
+        def union(key: str) -> List[str]:
+            return list(dict.fromkeys(
+                item for _, a in parsed for item in a.get(key, []) if item
+            ))[:5]
+
+        return {
+            "worth_watching_score": score,
+            "overall_sentiment": max(set(sentiments), key=sentiments.count),
+            "summary": max((a.get("summary", "") for _, a in parsed), key=len),
+            "pros": union("pros"),
+            "cons": union("cons"),
+            "key_themes": union("key_themes"),
+            "confidence_level": max(set(confidences), key=confidences.count),
+        }
+
+    def _analyze_with_llm(self, comments: List[str]) -> Dict:
+        """Analyze comments in concurrent batches and merge the results."""
+        try:
+            batches = [
+                comments[i:i + COMMENT_BATCH_SIZE]
+                for i in range(0, len(comments), COMMENT_BATCH_SIZE)
+            ]
+            prompts = [self._build_prompt(batch) for batch in batches]
+
+            if len(prompts) == 1:
+                responses = [self._generate_content(prompts[0])]
+            else:
+                # LLM calls are pure I/O wait, so threads give a linear
+                # speedup over the batches
+                with ThreadPoolExecutor(
+                    max_workers=MAX_CONCURRENT_LLM_CALLS
+                ) as executor:
+                    responses = list(executor.map(self._generate_content, prompts))
+
+            parsed = []
+            for batch, response in zip(batches, responses):
+                analysis = self._parse_analysis(response)
+                if analysis is not None:
+                    parsed.append((len(batch), analysis))
+
+            if not parsed:
                 return {
                     "worth_watching_score": 50,
                     "overall_sentiment": "mixed",
@@ -121,6 +215,8 @@ Respond with ONLY the JSON object, no additional text."""
                     "confidence_level": "low",
                 }
 
+            return self._merge_analyses(parsed)
+
         except Exception as e:
             logger.error(f"Error analyzing comments: {str(e)}")
             return {
@@ -0,0 +1,44 @@
+import orjson
+
+from manual_transcript import _extract_player_response
+
+
+class _FakeResponse:
+    """Minimal stand-in for a streaming requests response."""
+
+    def __init__(self, data: bytes, split_at: int):
+        self._parts = [data[:split_at], data[split_at:]]
+
+    def iter_content(self, chunk_size=65536):
+        for part in self._parts:
+            if part:
+                yield part
+
+
+PLAYER_RESPONSE = {
+    "captions": {
+        "playerCaptionsTracklistRenderer": {
+            "captionTracks": [{"languageCode": "en", "baseUrl": "http://x"}]
+        }
+    }
+}
+
+PAGE = (
+    b'<html><script>var other = "ytInitialPlayerResponse" + window.pad;'
+    b'</script><script>var ytInitialPlayerResponse = '
+    + orjson.dumps(PLAYER_RESPONSE)
+    + b';var meta = {};</script><p>trailing page content</p></html>'
+)
+
+
+def test_extracts_at_every_split_position():
+    # A network chunk boundary can land anywhere, including between the
+    # '=' and the JSON '{'; the extractor must parse regardless
+    for split_at in range(len(PAGE) + 1):
+        extracted = _extract_player_response(_FakeResponse(PAGE, split_at))
+        assert extracted == PLAYER_RESPONSE, f"failed at split {split_at}"
+
+
+def test_returns_none_without_assignment():
+    page = b'<html>"ytInitialPlayerResponse" appears only quoted</html>'
+    assert _extract_player_response(_FakeResponse(page, 10)) is None